@@ -0,0 +1,150 @@
+import argparse
+import json
+import re
+import time
+import tracemalloc
+
+import pdfplumber
+
+import fetch_horaire_classes
+from fetch_horaire_classes import PDF_DIR, PageGeometry, ScheduleEntry, discover_pdfs, parse_week_file
+
+
+def list_pdfs():
+    pdfs = [source.path for source in discover_pdfs(PDF_DIR)]
+    if not pdfs:
+        raise SystemExit(f"Aucun pdf trouvé dans {PDF_DIR}")
+    return pdfs
+
+
+def measure(build):
+    """Retourne (objet construit, octets encore alloués) pour la fonction donnée."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, after - before
+
+
+def bench_memory():
+    entries = []
+    for pdf in list_pdfs():
+        entries.extend(parse_week_file(pdf))
+    payload = json.dumps([e.to_dict() for e in entries], ensure_ascii=False)
+    count = len(entries)
+    # repartir de zéro pour que les chaînes et tuples partagés soient comptés dans la mesure
+    del entries
+    fetch_horaire_classes._TUPLE_POOL.clear()
+
+    # l'ancien format: un dict + des listes + des chaînes fraîches par entrée
+    _, dict_bytes = measure(lambda: json.loads(payload))
+    _, record_bytes = measure(lambda: [ScheduleEntry.from_dict(d) for d in json.loads(payload)])
+
+    print(f"{count} entrées sur {len(list_pdfs())} pdf")
+    print(f"dicts   : {dict_bytes / 1024:8.1f} KiB ({dict_bytes / count:6.1f} o/entrée)")
+    print(f"records : {record_bytes / 1024:8.1f} KiB ({record_bytes / count:6.1f} o/entrée)")
+    print(f"gain    : {100 * (1 - record_bytes / dict_bytes):.1f} %")
+
+
+def legacy_geometry(rects, words):
+    """Ancienne version en listes Python (build_column_bounds/build_time_mapper/within_bounds).
+
+    Gardée ici uniquement comme référence pour vérifier et chronométrer PageGeometry.
+    """
+    white = (1.0, 1.0, 1.0)
+    xs = sorted({round(r["x0"], 2) for r in rects if r.get("non_stroking_color") == white})
+    if not xs:
+        return []
+    last_x1 = max(r["x1"] for r in rects)
+    col_bounds = [(xs[i], xs[i + 1]) for i in range(len(xs) - 1)]
+    col_bounds.append((xs[-1], last_x1))
+
+    markers = []
+    for w in words:
+        m = re.match(r"(\d{2}:\d{2})\^?", w["text"])
+        if m:
+            mins = int(m.group(1)[:2]) * 60 + int(m.group(1)[3:])
+            markers.append((round((w["top"] + w["bottom"]) / 2, 2), mins))
+    markers = sorted(set(markers))
+    grid_y = sorted({round(r["top"], 2) for r in rects if r.get("non_stroking_color") == white})
+    start_map = []
+    for y_center, mins in markers:
+        below = [gy for gy in grid_y if gy <= y_center + 0.1]
+        if below:
+            start_map.append((max(below), mins))
+    start_map = sorted(set(start_map))
+
+    def map_y(y):
+        if not start_map:
+            return -1
+        candidates = [mins for y_start, mins in start_map if y >= y_start - 0.5]
+        return candidates[-1] if candidates else start_map[0][1]
+
+    result = []
+    for rect in rects:
+        color = rect.get("non_stroking_color")
+        if not color or color == white:
+            continue
+        cols = [
+            idx
+            for idx, (x0, x1) in enumerate(col_bounds)
+            if rect["x1"] > x0 + 0.5 and rect["x0"] < x1 - 0.5
+        ]
+        result.append((cols, map_y(rect["top"]), map_y(rect["bottom"])))
+    return result
+
+
+def vectorised_geometry(rects, words):
+    geometry = PageGeometry(rects, words)
+    if not geometry.has_grid:
+        return []
+    return [
+        (list(range(lo, hi)), start, end)
+        for lo, hi, start, end in zip(
+            geometry.first_col.tolist(),
+            geometry.stop_col.tolist(),
+            geometry.start_minutes.tolist(),
+            geometry.end_minutes.tolist(),
+        )
+    ]
+
+
+def bench_geometry(repeat=20):
+    # rects et mots extraits une fois: on ne mesure que la reconstruction de la grille
+    pages = []
+    for pdf_path in list_pdfs():
+        with pdfplumber.open(pdf_path) as pdf:
+            for page in pdf.pages:
+                if page.rects:
+                    pages.append((list(page.rects), page.extract_words()))
+
+    for rects, words in pages:
+        if legacy_geometry(rects, words) != vectorised_geometry(rects, words):
+            raise SystemExit("PageGeometry diverge de l'ancienne implémentation")
+
+    # meilleur passage sur `repeat`, en alternant les deux versions pour lisser le bruit machine
+    timings = {"listes": float("inf"), "numpy": float("inf")}
+    for _ in range(repeat):
+        for name, fn in (("listes", legacy_geometry), ("numpy", vectorised_geometry)):
+            start = time.perf_counter()
+            for rects, words in pages:
+                fn(rects, words)
+            timings[name] = min(timings[name], time.perf_counter() - start)
+
+    n_rects = sum(len(rects) for rects, _ in pages)
+    print(f"{len(pages)} pages, {n_rects} rects, résultats identiques")
+    for name, seconds in timings.items():
+        print(f"{name:7}: {seconds * 1000:8.1f} ms (meilleur passage)")
+    print(f"speedup: x{timings['listes'] / timings['numpy']:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks du parseur d'horaires")
+    parser.add_argument("bench", choices=["memory", "geometry"])
+    args = parser.parse_args()
+    {"memory": bench_memory, "geometry": bench_geometry}[args.bench]()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Jointure horaires x fiches UE x professeurs, faite une fois au build.
+
+Lit les shards de fetch_horaire_classes (schedule/manifest.json), les fiches de
+fetch_fiches_pea et les profils de fetch_ecam_professors, et écrit dans
+schedule_enriched/, à côté des shards servis, les mêmes shards avec le cours, l'activité
+et les profs déjà résolus. Les codes et initiales introuvables sont listés dans
+enrichment_report.json, dans le dossier de build (non publié).
+"""
+
+import hashlib
+import json
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from fetch_horaire_classes import (
+    BUILD_DIR,
+    MANIFEST_NAME,
+    SHARDS_DIR,
+    ScheduleEntry,
+    load_manifest,
+    load_shard,
+    write_if_changed,
+)
+import fetch_ecam_professors
+import fetch_fiches_pea
+from lookup_index import normalize
+
+FILES_DIR = Path("composeApp/src/commonMain/composeResources/files")
+# chemins repris des scrapers pour lire exactement ce qu'ils écrivent; seul le nom de
+# fichier des fiches est repris, leur OUTPUT_PATH étant absolu (machine de l'auteur)
+COURSES_PATH = FILES_DIR / fetch_fiches_pea.OUTPUT_PATH.name
+PROFESSORS_PATH = fetch_ecam_professors.OUTPUT_PATH
+ENRICHED_DIR = SHARDS_DIR.parent / "schedule_enriched"
+REPORT_PATH = BUILD_DIR / "enrichment_report.json"
+
+COURSE_FIELDS = ("code", "title", "details_url", "credits", "responsable", "language")
+PROFESSOR_FIELDS = ("professor_id", "first_name", "last_name", "email", "office", "photo_url")
+
+# la colonne profs des pdf contient parfois autre chose que des initiales
+# (numéros de local, quadrimestre "Q1"...): gardés dans les entrées, pas dans le rapport
+NOT_INITIALS_RE = re.compile(r"^(\d|Q\d)")
+
+
+def professor_id(prof: dict) -> str:
+    return (prof.get("professor_id") or prof["email"].split("@", 1)[0]).lower()
+
+
+def build_professor_tables(professors: List[dict]) -> Tuple[Dict[str, dict], Dict[str, dict]]:
+    """(initiales -> prof, "nom prénom" normalisé -> prof) pour les deux façons de citer un prof."""
+    by_id: Dict[str, dict] = {}
+    by_name: Dict[str, dict] = {}
+    for prof in professors:
+        record = {field: prof.get(field, "") for field in PROFESSOR_FIELDS}
+        record["professor_id"] = professor_id(prof)
+        by_id.setdefault(record["professor_id"], record)
+        by_name.setdefault(normalize(f"{prof['last_name']} {prof['first_name']}"), record)
+    return by_id, by_name
+
+
+def build_activity_table(courses: List[dict]) -> Dict[str, List[Tuple[dict, dict]]]:
+    """Code d'activité des horaires (CH1C pour "CH1C-T1-2022") -> [(fiche, activité)]."""
+    table: Dict[str, List[Tuple[dict, dict]]] = {}
+    for course in courses:
+        for activity in course.get("organized_activities", []):
+            code = activity.get("code", "").split("-", 1)[0].upper()
+            if code:
+                table.setdefault(code, []).append((course, activity))
+    return table
+
+
+def pick_activity(candidates: List[Tuple[dict, dict]], entry: ScheduleEntry) -> Tuple[dict, dict]:
+    """Une même activité peut figurer dans plusieurs fiches (tronc commun, options)."""
+
+    def score(candidate):
+        course, activity = candidate
+        bloc = course.get("bloc") or ""
+        same_bloc = bloc == entry.year_option
+        close_bloc = bool(bloc) and (bloc.startswith(entry.year_option) or entry.year_option.startswith(bloc))
+        same_title = normalize(activity.get("title", "")) == normalize(entry.course_name)
+        return (same_bloc, close_bloc, same_title)
+
+    # max garde le premier en cas d'égalité: l'ordre du fichier de fiches départage
+    return max(candidates, key=score)
+
+
+class ScheduleEnricher:
+    def __init__(self, courses: List[dict], professors: List[dict]) -> None:
+        self.activities = build_activity_table(courses)
+        self.professors_by_id, self.professors_by_name = build_professor_tables(professors)
+        self.unresolved_codes: Counter = Counter()
+        self.unresolved_teachers: Counter = Counter()
+        self.unresolved_fiche_teachers: Counter = Counter()
+        self.entries = 0
+
+    def enrich(self, entry: ScheduleEntry) -> dict:
+        self.entries += 1
+        record = entry.to_dict()
+        record["course"] = None
+        record["activity"] = None
+
+        candidates = self.activities.get(entry.course_code) if entry.course_code else None
+        if candidates:
+            course, activity = pick_activity(candidates, entry)
+            record["course"] = {field: course.get(field) for field in COURSE_FIELDS}
+            record["activity"] = {
+                "code": activity.get("code", ""),
+                "title": activity.get("title", ""),
+                "teachers": [self.fiche_teacher(name) for name in activity.get("teachers", [])],
+            }
+        else:
+            self.unresolved_codes[entry.course_code or "<sans code>"] += 1
+
+        record["teachers_details"] = [self.schedule_teacher(initials) for initials in entry.teachers]
+        return record
+
+    def schedule_teacher(self, initials: str) -> dict:
+        # même forme que fiche_teacher: l'initiale brute reste, professor vaut None si inconnu
+        prof = self.professors_by_id.get(initials.lower())
+        if prof is None and not NOT_INITIALS_RE.match(initials):
+            self.unresolved_teachers[initials] += 1
+        return {"initials": initials, "professor": prof}
+
+    def fiche_teacher(self, name: str) -> dict:
+        # les profs de la fiche sont cités "NOM Prénom", pas par leurs initiales
+        prof = self.professors_by_name.get(normalize(name))
+        if prof is None:
+            self.unresolved_fiche_teachers[name] += 1
+        return {"name": name, "professor": prof}
+
+    def report(self) -> dict:
+        return {
+            "entries": self.entries,
+            "unresolved_course_codes": dict(self.unresolved_codes.most_common()),
+            "unresolved_teachers": dict(self.unresolved_teachers.most_common()),
+            "unresolved_fiche_teachers": dict(self.unresolved_fiche_teachers.most_common()),
+        }
+
+
+def load_json(path: Path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def enrich_shards(enricher: ScheduleEnricher, shards_dir: Path, out_dir: Path) -> Optional[dict]:
+    manifest = load_manifest(shards_dir)
+    if not manifest["shards"]:
+        return None
+
+    out_shards = []
+    changed = 0
+    for shard in manifest["shards"]:
+        rel = shard["path"]
+        records = [enricher.enrich(entry) for entry in load_shard(shards_dir, rel)]
+        text = json.dumps(records, ensure_ascii=False, indent=2)
+        if write_if_changed(out_dir / rel, text):
+            changed += 1
+        out_shards.append(dict(shard, sha256=hashlib.sha256(text.encode("utf-8")).hexdigest()))
+
+    known = {shard["path"] for shard in out_shards}
+    for stale in out_dir.glob("*/*/*.json"):
+        if stale.relative_to(out_dir).as_posix() not in known:
+            stale.unlink()
+
+    write_if_changed(
+        out_dir / MANIFEST_NAME,
+        json.dumps({"shards": out_shards}, ensure_ascii=False, separators=(",", ":")),
+    )
+    print(f"{len(out_shards)} shards enrichis dans {out_dir} ({changed} modifiés)")
+    return enricher.report()
+
+
+def main():
+    courses = load_json(COURSES_PATH)
+    professors = load_json(PROFESSORS_PATH)["professors"]
+    enricher = ScheduleEnricher(courses, professors)
+
+    report = enrich_shards(enricher, SHARDS_DIR, ENRICHED_DIR)
+    if report is None:
+        raise SystemExit(f"Aucun shard dans {SHARDS_DIR}: lancer fetch_horaire_classes.py d'abord")
+
+    write_if_changed(REPORT_PATH, json.dumps(report, ensure_ascii=False, indent=2))
+    print(
+        f"{report['entries']} entrées, "
+        f"{len(report['unresolved_course_codes'])} codes de cours et "
+        f"{len(report['unresolved_teachers'])} initiales non résolus (voir {REPORT_PATH})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,19 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import re
-import unicodedata
+import tempfile
+from html.parser import HTMLParser
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional, Tuple
 from urllib.parse import urlsplit
 
-import requests
+import aiohttp
 from bs4 import BeautifulSoup
 
+from lookup_index import name_tokens, strip_accents, write_indexed_json
+
 # Entry point page that lists every staff member with a link to their profile.
 ANNUAIRE_PAGE_ENDPOINT = "https://www.ecam.be/wp-json/wp/v2/pages?slug=annuaire"
 
@@ -22,6 +26,16 @@ PROFILE_URL_CANDIDATES = [
 OUTPUT_PATH = Path(
     "composeApp/src/commonMain/composeResources/files/ecam_professors_2025_test.json"
 )
+# Lookup keys of the .idx written for OUTPUT_PATH (see lookup_index.LookupIndex).
+# professor_id is the email local part, i.e. the initials used in the schedules.
+INDEX_KEYS = {
+    "professor_id": lambda prof: [prof["professor_id"]],
+    "name": lambda prof: name_tokens(prof["first_name"], prof["last_name"]),
+}
+
+# Profiles are appended here as JSON lines while the crawl runs, then reordered into OUTPUT_PATH.
+# Kept out of composeResources, whose content is bundled into the app.
+PARTIAL_OUTPUT_PATH = Path(tempfile.gettempdir()) / f"{OUTPUT_PATH.stem}.partial.jsonl"
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (compatible; ECAMFetcher/2.1; +https://www.ecam.be)"
@@ -31,12 +45,6 @@ DEFAULT_OFFICE = "Non renseigné"
 DEFAULT_SPECIALITY = "Non renseigné"
 
 
-def strip_accents(value: str) -> str:
-    return "".join(
-        char for char in unicodedata.normalize("NFKD", value) if not unicodedata.combining(char)
-    )
-
-
 def clean_text(value: str) -> str:
     return " ".join(value.replace("\xa0", " ").split()).strip()
 
@@ -52,28 +60,114 @@ def extract_slug(url: str) -> Optional[str]:
     return slug
 
 
-session = requests.Session()
-session.headers.update(HEADERS)
-
-
 REQUEST_TIMEOUT = 8
 
+# Upper bound on simultaneous requests to ecam.be, whatever the number of profiles.
+MAX_CONCURRENT_REQUESTS = 8
+
 
-def fetch_annuaire_content() -> str:
-    response = session.get(ANNUAIRE_PAGE_ENDPOINT, timeout=REQUEST_TIMEOUT)
-    response.raise_for_status()
-    data = response.json()
+async def fetch_annuaire_content(http: aiohttp.ClientSession) -> str:
+    async with http.get(ANNUAIRE_PAGE_ENDPOINT) as response:
+        response.raise_for_status()
+        data = await response.json()
     if not data:
         raise RuntimeError("Aucune donnee renvoyee par l'API annuaire")
     return data[0]["content"]["rendered"]
 
 
-def collect_slugs_and_fallback_names(html: str) -> Iterable[Tuple[str, str]]:
-    soup = BeautifulSoup(html, "html.parser")
+# Size of the pieces of annuaire HTML fed to the parser between two yields.
+ANNUAIRE_CHUNK_SIZE = 16 * 1024
+
+
+# get_text() leaves out the strings of these tags, so anchors inside them get no text.
+NON_TEXT_TAGS = {"script", "style", "template"}
+
+
+class AnchorParser(HTMLParser):
+    """Incremental <a> extractor: anchors become available as soon as they are closed.
+
+    Text is gathered like BeautifulSoup's get_text(" ", strip=True), anchors are
+    released in document order, and nested anchors each receive their inner text.
+    A text node can reach handle_data in several pieces (feed() boundaries), so the
+    pieces are buffered and only stripped once the node ends, at the next tag.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self._anchors: List[list] = []  # [href, text parts, closed], in start order
+        self._open: List[list] = []
+        self._hidden = 0
+        self._pending: List[str] = []
+
+    def _flush_text(self) -> None:
+        text = "".join(self._pending).strip()
+        self._pending = []
+        if text and not self._hidden:
+            for anchor in self._open:
+                anchor[1].append(text)
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if tag in NON_TEXT_TAGS:
+            self._hidden += 1
+        elif tag == "a":
+            anchor = [dict(attrs).get("href"), [], False]
+            self._anchors.append(anchor)
+            self._open.append(anchor)
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        if tag in NON_TEXT_TAGS:
+            self._hidden = max(self._hidden - 1, 0)
+        elif tag == "a" and self._open:
+            self._open.pop()[2] = True
+
+    def handle_data(self, data):
+        self._pending.append(data)
+
+    # Comments and declarations also end a text node in BeautifulSoup.
+    def handle_comment(self, data):
+        self._flush_text()
+
+    def handle_decl(self, decl):
+        self._flush_text()
+
+    def handle_pi(self, data):
+        self._flush_text()
+
+    def pop_closed(self) -> List[Tuple[Optional[str], str]]:
+        ready = 0
+        while ready < len(self._anchors) and self._anchors[ready][2]:
+            ready += 1
+        done, self._anchors = self._anchors[:ready], self._anchors[ready:]
+        return [(href, " ".join(parts)) for href, parts, _ in done]
+
+    def close(self) -> None:
+        super().close()
+        self._flush_text()
+        # Unclosed anchors end with the document, as in BeautifulSoup.
+        for anchor in self._open:
+            anchor[2] = True
+        self._open = []
+
+
+def iter_anchors(
+    html: str, chunk_size: int = ANNUAIRE_CHUNK_SIZE
+) -> Iterable[Tuple[Optional[str], str]]:
+    parser = AnchorParser()
+    for start in range(0, len(html), chunk_size):
+        parser.feed(html[start : start + chunk_size])
+        yield from parser.pop_closed()
+    parser.close()
+    yield from parser.pop_closed()
+
+
+def collect_slugs_and_fallback_names(
+    html: str, chunk_size: int = ANNUAIRE_CHUNK_SIZE
+) -> Iterable[Tuple[str, str]]:
     seen: Dict[str, str] = {}
 
-    for anchor in soup.find_all("a"):
-        href = anchor.get("href")
+    for href, text in iter_anchors(html, chunk_size):
         if not href:
             continue
         slug = extract_slug(href)
@@ -82,20 +176,23 @@ def collect_slugs_and_fallback_names(html: str) -> Iterable[Tuple[str, str]]:
         slug_key = slug.lower()
         if slug_key in seen:
             continue
-        fallback_name = clean_text(anchor.get_text(" ", strip=True))
+        fallback_name = clean_text(text)
         seen[slug_key] = slug
         yield slug, fallback_name
 
 
-def fetch_profile_html(slug: str) -> Optional[str]:
-    for template in PROFILE_URL_CANDIDATES:
-        url = template.format(slug=slug)
-        try:
-            response = session.get(url, timeout=REQUEST_TIMEOUT)
-            if response.status_code == 200:
-                return response.text
-        except Exception:
-            continue
+async def fetch_profile_html(
+    http: aiohttp.ClientSession, limiter: asyncio.Semaphore, slug: str
+) -> Optional[str]:
+    async with limiter:
+        for template in PROFILE_URL_CANDIDATES:
+            url = template.format(slug=slug)
+            try:
+                async with http.get(url) as response:
+                    if response.status == 200:
+                        return await response.text()
+            except Exception:
+                continue
     return None
 
 
@@ -214,32 +311,93 @@ def build_professor_entry(
     }
 
 
+class ProfessorWriter:
+    """Streams profiles to PARTIAL_OUTPUT_PATH as they complete, in completion order.
+
+    close() writes the final OUTPUT_PATH sorted by id, so the result does not depend
+    on which request finished first, and removes the partial file.
+    """
+
+    def __init__(self, partial_path: Path) -> None:
+        self.partial_path = partial_path
+        self.professors: List[Dict[str, str]] = []
+        self._file = partial_path.open("w", encoding="utf-8")
+
+    def write(self, entry: Dict[str, str]) -> None:
+        self.professors.append(entry)
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self) -> List[Dict[str, str]]:
+        self._file.close()
+        professors = sorted(self.professors, key=lambda entry: entry["id"])
+        generate_json(professors)
+        self.partial_path.unlink()
+        return professors
+
+    def abort(self) -> None:
+        # Keep what was fetched so far for inspection, but release the handle.
+        self._file.close()
+        print(f"Crawl interrompu, profils deja recuperes dans {self.partial_path}")
+
+
 def generate_json(professors: List[Dict[str, str]]) -> None:
-    payload = {"professors": professors}
-    OUTPUT_PATH.write_text(
-        json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8"
+    index_path = write_indexed_json(
+        professors, OUTPUT_PATH, INDEX_KEYS, wrapper_key="professors"
+    )
+    print(f"{len(professors)} profils enregistres dans {OUTPUT_PATH} (index {index_path})")
+
+
+async def fetch_professor(
+    http: aiohttp.ClientSession,
+    limiter: asyncio.Semaphore,
+    writer: ProfessorWriter,
+    idx: int,
+    slug: str,
+    fallback_name: str,
+) -> None:
+    profile_html = await fetch_profile_html(http, limiter, slug) or ""
+    if not profile_html:
+        print(f"[{idx}] WARNING: profil {slug} introuvable, valeurs par defaut utilisees")
+    soup = BeautifulSoup(profile_html, "html.parser")
+    entry = build_professor_entry(idx, slug, fallback_name, soup)
+    writer.write(entry)
+    print(
+        f"[{idx}] {entry['first_name']} {entry['last_name']} -> {entry['email']} ({entry['office']})"
     )
-    print(f"{len(professors)} profils enregistres dans {OUTPUT_PATH}")
+
+
+async def crawl() -> List[Dict[str, str]]:
+    limiter = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    async with aiohttp.ClientSession(headers=HEADERS, timeout=timeout) as http:
+        annuaire_html = await fetch_annuaire_content(http)
+        writer = ProfessorWriter(PARTIAL_OUTPUT_PATH)
+        tasks = []
+        completed = False
+        try:
+            for idx, (slug, fallback_name) in enumerate(
+                collect_slugs_and_fallback_names(annuaire_html), start=1
+            ):
+                tasks.append(
+                    asyncio.create_task(
+                        fetch_professor(http, limiter, writer, idx, slug, fallback_name)
+                    )
+                )
+                # Let the fetches already queued hit the network before reading the next anchor.
+                await asyncio.sleep(0)
+            await asyncio.gather(*tasks)
+            completed = True
+        finally:
+            for task in tasks:
+                task.cancel()
+            if not completed:
+                writer.abort()
+        return writer.close()
 
 
 def main() -> None:
-    annuaire_html = fetch_annuaire_content()
-    professors: List[Dict[str, str]] = []
-
-    for idx, (slug, fallback_name) in enumerate(
-        collect_slugs_and_fallback_names(annuaire_html), start=1
-    ):
-        profile_html = fetch_profile_html(slug) or ""
-        if not profile_html:
-            print(f"[{idx}] WARNING: profil {slug} introuvable, valeurs par defaut utilisees")
-        soup = BeautifulSoup(profile_html, "html.parser")
-        entry = build_professor_entry(idx, slug, fallback_name, soup)
-        professors.append(entry)
-        print(
-            f"[{idx}] {entry['first_name']} {entry['last_name']} -> {entry['email']} ({entry['office']})"
-        )
-
-    generate_json(professors)
+    asyncio.run(crawl())
 
 
 if __name__ == "__main__":
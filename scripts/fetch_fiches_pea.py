@@ -8,6 +8,8 @@ import requests
 import re
 from bs4 import BeautifulSoup
 
+from lookup_index import name_tokens, write_indexed_json
+
 INPUT_PATH = Path("/Users/nicolasschell/Documents/GitHub/CompanionAppStudent/composeApp/src/commonMain/composeResources/files/ecam_formations_2025.json")
 OUTPUT_PATH = Path("/Users/nicolasschell/Documents/GitHub/CompanionAppStudent/composeApp/src/commonMain/composeResources/files/ecam_courses_details_2025.json")
 BASE_URL = "https://plus.ecam.be"
@@ -16,6 +18,16 @@ HEADERS = {
     "User-Agent": "Mozilla/5.0 (compatible; ECAMFetcher/1.3; +https://plus.ecam.be)"
 }
 
+# clés de l'index de OUTPUT_PATH (voir lookup_index.index_path_for): code UE, code d'activité des horaires
+# (CH1C pour "CH1C-T1-2022") et jetons du titre pour la recherche
+INDEX_KEYS = {
+    "code": lambda course: [course.get("code")],
+    "activity_code": lambda course: [
+        act["code"].split("-", 1)[0] for act in course.get("organized_activities", []) if act.get("code")
+    ],
+    "name": lambda course: name_tokens(course.get("title"), course.get("code")),
+}
+
 
 def fetch_html(url: str) -> Optional[str]:
     try:
@@ -202,10 +214,8 @@ def collect_courses(input_path: Path) -> list[dict]:
 def main():
     print(f"🔍 Lecture de {INPUT_PATH}")
     courses = collect_courses(INPUT_PATH)
-    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
-        json.dump(courses, f, ensure_ascii=False, indent=2)
-    print(f"💾 Sauvegardé dans {OUTPUT_PATH} ({len(courses)} cours)")
+    index_path = write_indexed_json(courses, OUTPUT_PATH, INDEX_KEYS)
+    print(f"💾 Sauvegardé dans {OUTPUT_PATH} ({len(courses)} cours, index {index_path.name})")
 
 
 if __name__ == "__main__":
@@ -1,13 +1,162 @@
+import argparse
+import hashlib
 import json
 import re
-from datetime import datetime, timedelta
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from operator import itemgetter
 from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
+import numpy as np
 import pdfplumber
 
 # mets ici le dossier contenant les fichiers P1_horsem_0X_....pdf
 PDF_DIR = Path("Horaire cours")
 OUTPUT_JSON = "composeApp\\src\\commonMain\\composeResources\\files\\ecam_calendar_courses_schedule_2025.json"
+# servi tel quel par le serveur (staticResources("/", "static")), hors du bundle de l'app
+SERVER_STATIC_DIR = Path("server/src/main/resources/static")
+# état de build (empreintes des pdf, version du parseur...): jamais publié
+BUILD_DIR = Path("scripts/.build")
+# un fichier par (année académique, période, semaine, year_option) + un manifest.json compact
+# que les clients lisent pour ne télécharger que leurs shards
+SHARDS_DIR = SERVER_STATIC_DIR / "schedule"
+MANIFEST_NAME = "manifest.json"
+SHARDS_STATE_PATH = BUILD_DIR / "schedule_state.json"
+# un .ics par (année académique, year_option, groupe, série), importable tel quel dans un agenda;
+# le hash, SEQUENCE et DTSTAMP de chaque UID restent dans l'état de build
+ICS_DIR = SERVER_STATIC_DIR / "ics"
+ICS_STATE_PATH = BUILD_DIR / "ics_state.json"
+ICS_TZID = "Europe/Brussels"
+ICS_UID_DOMAIN = "companion.ecam.be"
+
+# ex: P1_horsem_06_Semaine_du__Lu_15_09_2025_au__Di_21_09_2025[38]_1991136.pdf
+PDF_GLOB = "*_Semaine_du__Lu_*.pdf"
+PDF_NAME_RE = re.compile(
+    r"^(?P<period>[A-Za-z0-9]+)_(?P<kind>[A-Za-z]+)_0?(?P<week>\d+)_Semaine_du__Lu_(?P<day>\d{2})_(?P<month>\d{2})_(?P<year>\d{4})_au__"
+)
+
+
+@dataclass(slots=True, frozen=True)
+class ScheduleEntry:
+    """Une plage de cours; même forme JSON que l'ancien dict, mais sans __dict__ par entrée."""
+
+    week: int
+    year_option: str
+    group: int
+    series: Tuple[str, ...]
+    date: str
+    day_name: str
+    start_time: str
+    end_time: str
+    course_code: str
+    teachers: Tuple[str, ...]
+    room: Tuple[str, ...]
+    course_name: str
+
+    def to_dict(self) -> dict:
+        return {
+            "week": self.week,
+            "year_option": self.year_option,
+            "group": self.group,
+            "series": list(self.series),
+            "date": self.date,
+            "day_name": self.day_name,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "course_code": self.course_code,
+            "teachers": list(self.teachers),
+            "room": list(self.room),
+            "course_name": self.course_name,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ScheduleEntry":
+        return cls(
+            week=data["week"],
+            year_option=sys.intern(data["year_option"]),
+            group=data["group"],
+            series=intern_tuple(data["series"]),
+            date=sys.intern(data["date"]),
+            day_name=sys.intern(data["day_name"]),
+            start_time=sys.intern(data["start_time"]),
+            end_time=sys.intern(data["end_time"]),
+            course_code=sys.intern(data["course_code"]),
+            teachers=intern_tuple(data["teachers"]),
+            room=intern_tuple(data["room"]),
+            course_name=sys.intern(data["course_name"]),
+        )
+
+
+# les mêmes listes (séries, profs, locaux) reviennent des milliers de fois: on partage un seul tuple
+_TUPLE_POOL = {}
+
+
+def intern_tuple(values) -> Tuple[str, ...]:
+    key = tuple(sys.intern(v) for v in values)
+    return _TUPLE_POOL.setdefault(key, key)
+
+
+@dataclass(slots=True, frozen=True)
+class ScheduleSource:
+    """Un pdf d'horaire et ce que son nom nous apprend (période, semaine, année)."""
+
+    path: Path
+    period: str
+    kind: str
+    week: int
+    monday: datetime
+
+    @property
+    def academic_year(self) -> str:
+        return academic_year_for(self.monday)
+
+    @property
+    def key(self) -> str:
+        """Identifie la semaine publiée; deux pdf avec la même clé écriraient les mêmes shards."""
+        return f"{self.academic_year}/{self.period}_{self.kind}/w{self.week:02d}"
+
+
+def academic_year_for(day: datetime) -> str:
+    # l'année académique commence en septembre
+    start = day.year if day.month >= 9 else day.year - 1
+    return f"{start}-{start + 1}"
+
+
+def describe_pdf(path: Path) -> Optional[ScheduleSource]:
+    match = PDF_NAME_RE.match(path.name)
+    if not match:
+        return None
+    return ScheduleSource(
+        path=path,
+        period=match.group("period").upper(),
+        kind=match.group("kind").lower(),
+        week=int(match.group("week")),
+        monday=datetime(int(match.group("year")), int(match.group("month")), int(match.group("day"))),
+    )
+
+
+def discover_pdfs(pdf_dir: Path) -> List[ScheduleSource]:
+    """Tous les pdf d'horaire du dossier, toutes périodes et années confondues.
+
+    Refuse deux pdf pour la même semaine (ex: une semaine republiée avec un autre suffixe):
+    il faut retirer l'ancien plutôt que laisser l'un écraser l'autre au hasard.
+    """
+    sources = []
+    by_key: Dict[str, Path] = {}
+    for path in sorted(pdf_dir.glob(PDF_GLOB)):
+        source = describe_pdf(path)
+        if source is None:
+            print(f"Nom de pdf non reconnu, ignoré: {path.name}")
+            continue
+        if source.key in by_key:
+            raise SystemExit(
+                f"Deux pdf pour {source.key}: {by_key[source.key].name} et {path.name}; retirer l'ancien"
+            )
+        by_key[source.key] = path
+        sources.append(source)
+    return sorted(sources, key=lambda src: (src.academic_year, src.period, src.kind, src.week))
 
 
 def extract_monday_date_from_filename(name: str) -> datetime:
@@ -81,50 +230,81 @@ def extract_group_labels(row, start, end):
     return labels
 
 
-def build_column_bounds(page):
-    xs = sorted(
-        {round(r["x0"], 2) for r in page.rects if r.get("non_stroking_color") == (1.0, 1.0, 1.0)}
-    )
-    if not xs:
-        return []
-    last_x1 = max(r["x1"] for r in page.rects)
-    bounds = [(xs[i], xs[i + 1]) for i in range(len(xs) - 1)]
-    bounds.append((xs[-1], last_x1))
-    return bounds
-
-
-def build_time_mapper(page):
-    words = page.extract_words()
-    markers = []
-    for w in words:
-        m = re.match(r"(\d{2}:\d{2})\^?", w["text"])
-        if m:
-            mins = int(m.group(1)[:2]) * 60 + int(m.group(1)[3:])
-            y = (w["top"] + w["bottom"]) / 2
-            markers.append((round(y, 2), mins))
-    markers = sorted(set(markers))
-
-    grid_y = sorted(
-        {round(r["top"], 2) for r in page.rects if r.get("non_stroking_color") == (1.0, 1.0, 1.0)}
-    )
-    start_map = []
-    for y_center, mins in markers:
-        below = [gy for gy in grid_y if gy <= y_center + 0.1]
-        if not below:
-            continue
-        start_y = max(below)
-        start_map.append((start_y, mins))
-    start_map = sorted(set(start_map))
+WHITE = (1.0, 1.0, 1.0)
+RECT_COORDS = itemgetter("x0", "x1", "top", "bottom")
+TIME_MARKER_RE = re.compile(r"(\d{2}:\d{2})\^?")
 
-    def map_y(y):
-        if not start_map:
-            return None
-        candidates = [mins for y_start, mins in start_map if y >= y_start - 0.5]
-        if not candidates:
-            return start_map[0][1]
-        return candidates[-1]
 
-    return map_y
+class PageGeometry:
+    """Grille d'une page chargée une fois en tableaux numpy.
+
+    Les rects blancs donnent les colonnes (x0) et les lignes (top) de la grille, les rects
+    colorés sont les blocs de cours. Colonnes et plages horaires de tous les blocs sont
+    calculées d'un coup avec searchsorted au lieu de boucler rect par rect.
+    """
+
+    def __init__(self, rects, words, tol=0.5):
+        colors = [r.get("non_stroking_color") for r in rects]
+        white = np.fromiter((c == WHITE for c in colors), dtype=bool, count=len(colors))
+        colored = np.fromiter((bool(c) for c in colors), dtype=bool, count=len(colors)) & ~white
+        coords = np.array(list(map(RECT_COORDS, rects)), dtype=float).reshape(-1, 4)
+        x0, x1, top, bottom = coords.T
+
+        # colonnes: [x0 blanc, x0 blanc suivant[, la dernière va jusqu'au bord droit
+        self.col_starts = np.unique(np.round(x0[white], 2))
+        if self.col_starts.size:
+            self.col_ends = np.append(self.col_starts[1:], x1.max())
+        else:
+            self.col_ends = self.col_starts
+
+        # lignes: chaque repère "08:30" est accroché à la ligne de grille juste au-dessus
+        hits = [(w["top"], w["bottom"], m[1]) for w in words if (m := TIME_MARKER_RE.match(w["text"]))]
+        grid_y = np.unique(np.round(top[white], 2))
+        slots = set()
+        if hits and grid_y.size:
+            marker_y = np.array([(t, b) for t, b, _ in hits], dtype=float)
+            centers = np.round(marker_y.sum(axis=1) / 2, 2)
+            below = (np.searchsorted(grid_y, centers + 0.1, side="right") - 1).tolist()
+            grid = grid_y.tolist()
+            pairs = {(i, hhmm) for i, (_, _, hhmm) in zip(below, hits) if i >= 0}
+            slots = {(grid[i], int(hhmm[:2]) * 60 + int(hhmm[3:])) for i, hhmm in pairs}
+        slots = sorted(slots)
+        self.slot_tops = np.array([y for y, _ in slots], dtype=float)
+        self.slot_minutes = np.array([mins for _, mins in slots], dtype=int)
+
+        # blocs de cours, dans l'ordre de la page
+        idx = np.flatnonzero(colored)
+        self.course_rects = [rects[i] for i in idx]
+        # colonnes touchées par chaque bloc: [first_col, stop_col[
+        self.first_col = np.searchsorted(self.col_ends - tol, x0[idx], side="right")
+        self.stop_col = np.searchsorted(self.col_starts + tol, x1[idx], side="left")
+        self.start_minutes = self.map_y(top[idx])
+        self.end_minutes = self.map_y(bottom[idx])
+
+    @property
+    def has_grid(self) -> bool:
+        return bool(self.col_starts.size)
+
+    @property
+    def has_times(self) -> bool:
+        return bool(self.slot_tops.size)
+
+    def map_y(self, ys):
+        """Minutes de la dernière ligne de grille au-dessus de chaque y (-1 si pas de repères)."""
+        if not self.has_times:
+            return np.full(len(ys), -1, dtype=int)
+        slot = np.searchsorted(self.slot_tops - 0.5, ys, side="right") - 1
+        return self.slot_minutes[np.maximum(slot, 0)]
+
+    def blocks_in_columns(self, col_lo, col_hi):
+        """Blocs qui touchent les colonnes ]col_lo, col_hi] du jour.
+
+        Yield (rect, première colonne, dernière colonne + 1, début, fin) en minutes.
+        """
+        lo = np.maximum(self.first_col, col_lo + 1)
+        hi = np.minimum(self.stop_col, col_hi + 1)
+        for i in np.flatnonzero(lo < hi):
+            yield self.course_rects[i], int(lo[i]), int(hi[i]), int(self.start_minutes[i]), int(self.end_minutes[i])
 
 
 def split_room_tokens(text: str):
@@ -220,156 +400,532 @@ def minutes_to_hhmm(minutes):
     return f"{h:02d}:{m:02d}"
 
 
-def within_bounds(col_bounds, rect, tol=0.5):
-    cols = []
-    for idx, (x0, x1) in enumerate(col_bounds):
-        if rect["x1"] > x0 + tol and rect["x0"] < x1 - tol:
-            cols.append(idx)
-    return cols
+class PageContent:
+    """Tout ce que parse_pages lit d'une page: table, rects, mots et texte des blocs.
+
+    Sur une page ouverte, le texte d'un bloc est extrait à la demande. detach() le calcule
+    pour tous les blocs et lâche la page, pour garder l'extraction pdfplumber en cache
+    (golden_corpus.py --cache) et rejouer seulement la logique du parseur.
+    """
+
+    # à incrémenter si ce qui est extrait change: invalide les caches existants
+    VERSION = 1
+
+    __slots__ = ("table", "rects", "words", "texts", "_page")
+
+    def __init__(self, page) -> None:
+        self._page = page
+        self.table = page.extract_table()
+        self.texts: Dict[Tuple[float, ...], str] = {}
+        # rects et mots ne sont lus que si la page a une table d'horaire
+        self.rects = None
+        self.words = None
+
+    def load_layout(self) -> None:
+        if self.rects is None:
+            self.rects = self._page.rects
+            self.words = self._page.extract_words()
+
+    def block_text(self, rect) -> str:
+        key = RECT_COORDS(rect)
+        if key not in self.texts:
+            bbox = (
+                rect["x0"] + 0.5,
+                rect["top"] + 0.5,
+                rect["x1"] - 0.5,
+                rect["bottom"] - 0.5,
+            )
+            cropped = self._page.within_bbox(bbox, relative=False)
+            self.texts[key] = cropped.extract_text(x_tolerance=1) or ""
+        return self.texts[key]
+
+    def detach(self) -> "PageContent":
+        self.load_layout()
+        for rect in self.rects:
+            color = rect.get("non_stroking_color")
+            if color and color != WHITE:
+                self.block_text(rect)
+        # seuls les champs lus par PageGeometry et parse_pages sont gardés
+        self.rects = [
+            {key: rect.get(key) for key in ("x0", "x1", "top", "bottom", "non_stroking_color")}
+            for rect in self.rects
+        ]
+        self.words = [{key: word[key] for key in ("text", "top", "bottom")} for word in self.words]
+        self._page = None
+        return self
+
+    def __getstate__(self):
+        return (self.table, self.rects, self.words, self.texts)
+
+    def __setstate__(self, state):
+        self.table, self.rects, self.words, self.texts = state
+        self._page = None
+
+
+def extract_pages(pdf_path: Path) -> Iterator[PageContent]:
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            yield PageContent(page)
 
 
 def parse_week_file(pdf_path: Path):
-    monday = extract_monday_date_from_filename(pdf_path.name)
-    week_num = int(re.search(r"_0?(\d+)_Semaine_du__", pdf_path.name).group(1))
+    return parse_pages(pdf_path.name, extract_pages(pdf_path))
+
+
+def parse_pages(pdf_name: str, pages: Iterable[PageContent]) -> List[ScheduleEntry]:
+    monday = extract_monday_date_from_filename(pdf_name)
+    week_num = int(re.search(r"_0?(\d+)_Semaine_du__", pdf_name).group(1))
     entries = []
 
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            table = page.extract_table()
-            if not table or len(table) < 5:
-                continue
+    for page in pages:
+        table = page.table
+        if not table or len(table) < 5:
+            continue
+
+        header_row = table[0]
+        header_text = " ".join(filter(None, header_row)).upper().replace(" ", "")
+        if "SEM" not in header_text:
+            continue
+
+        time_cols = find_time_columns(table)
+        if not time_cols:
+            continue
 
-            header_row = table[0]
-            header_text = " ".join(filter(None, header_row)).upper().replace(" ", "")
-            if "SEM" not in header_text:
+        group_header_row = table[1]
+        series_row = table[2]
+        page.load_layout()
+        geometry = PageGeometry(page.rects, page.words)
+        if not geometry.has_grid:
+            continue
+
+        # chaque col de temps = un jour sur la page
+        blocks = []
+        for i, start_col in enumerate(time_cols):
+            end_col = time_cols[i + 1] - 1 if i + 1 < len(time_cols) else len(header_row) - 1
+            blocks.append((start_col, end_col))
+
+        for block_start, block_end in blocks:
+            day_header = " ".join(filter(None, header_row[block_start:block_end + 1]))
+            try:
+                day_idx = french_day_name_to_index(day_header)
+            except ValueError:
                 continue
+            date = (monday + timedelta(days=day_idx)).strftime("%Y-%m-%d")
+            day_name_fr = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"][day_idx]
 
-            time_cols = find_time_columns(table)
-            if not time_cols:
+            group_chunks = extract_group_labels(group_header_row, block_start, block_end)
+            starts = [c[0] for c in group_chunks]
+            if not starts:
                 continue
 
-            group_header_row = table[1]
-            series_row = table[2]
-            col_bounds = build_column_bounds(page)
-            time_mapper = build_time_mapper(page)
-            if not col_bounds or not time_mapper:
+            # associer chaque colonne à son groupe le plus proche
+            col_to_group = {}
+            for col in range(block_start + 1, block_end + 1):
+                nearest = min(starts, key=lambda s: abs(col - s))
+                col_to_group[col] = nearest
+
+            groups = {}
+            for start_idx, year_option, group in group_chunks:
+                cols = [c for c, g in col_to_group.items() if g == start_idx]
+                series = [series_row[c] for c in cols if c < len(series_row) and series_row[c]]
+                groups[start_idx] = {
+                    "year_option": year_option,
+                    "group": group,
+                    "cols": cols,
+                    "series": series,
+                }
+
+            if not groups:
                 continue
 
-            # chaque col de temps = un jour sur la page
-            blocks = []
-            for i, start_col in enumerate(time_cols):
-                end_col = time_cols[i + 1] - 1 if i + 1 < len(time_cols) else len(header_row) - 1
-                blocks.append((start_col, end_col))
-
-            for block_start, block_end in blocks:
-                day_header = " ".join(filter(None, header_row[block_start:block_end + 1]))
-                try:
-                    day_idx = french_day_name_to_index(day_header)
-                except ValueError:
+            for rect, col_lo, col_hi, start_min, end_min in geometry.blocks_in_columns(block_start, block_end):
+                # déterminer le groupe via la colonne dominante
+                group_start = col_to_group.get(col_lo)
+                if group_start is None or group_start not in groups:
                     continue
-                date = (monday + timedelta(days=day_idx)).strftime("%Y-%m-%d")
-                day_name_fr = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"][day_idx]
+                g_val = groups[group_start]
 
-                group_chunks = extract_group_labels(group_header_row, block_start, block_end)
-                starts = [c[0] for c in group_chunks]
-                if not starts:
-                    continue
+                series_list = [series_row[c] for c in range(col_lo, col_hi) if c < len(series_row) and series_row[c]]
 
-                # associer chaque colonne à son groupe le plus proche
-                col_to_group = {}
-                for col in range(block_start + 1, block_end + 1):
-                    nearest = min(starts, key=lambda s: abs(col - s))
-                    col_to_group[col] = nearest
-
-                groups = {}
-                for start_idx, year_option, group in group_chunks:
-                    cols = [c for c, g in col_to_group.items() if g == start_idx]
-                    series = [series_row[c] for c in cols if c < len(series_row) and series_row[c]]
-                    groups[start_idx] = {
-                        "year_option": year_option,
-                        "group": group,
-                        "cols": cols,
-                        "series": series,
-                    }
-
-                if not groups:
+                if start_min < 0 or end_min < 0:
                     continue
-
-                # rects colorés = blocs de cours
-                course_rects = [
-                    r
-                    for r in page.rects
-                    if r.get("non_stroking_color") and r["non_stroking_color"] != (1.0, 1.0, 1.0)
-                ]
-
-                for rect in course_rects:
-                    cols_in_rect = within_bounds(col_bounds, rect)
-                    # filtrer ceux qui sont dans le bloc de colonnes du jour
-                    cols_in_block = [c for c in cols_in_rect if block_start < c <= block_end]
-                    if not cols_in_block:
-                        continue
-                    # déterminer le groupe via la colonne dominante
-                    dominant_col = cols_in_block[0]
-                    group_start = col_to_group.get(dominant_col)
-                    if group_start is None or group_start not in groups:
-                        continue
-                    g_val = groups[group_start]
-
-                    series_list = [series_row[c] for c in cols_in_block if c < len(series_row) and series_row[c]]
-
-                    y_start = rect["top"]
-                    y_end = rect["bottom"]
-                    start_min = time_mapper(y_start)
-                    end_min = time_mapper(y_end)
-                    if start_min is None or end_min is None:
-                        continue
-                    bbox = (
-                        rect["x0"] + 0.5,
-                        rect["top"] + 0.5,
-                        rect["x1"] - 0.5,
-                        rect["bottom"] - 0.5,
-                    )
-                    cropped = page.within_bbox(bbox, relative=False)
-                    text = cropped.extract_text(x_tolerance=1) or ""
-                    text = " ".join(text.split())
-                    code_match = re.search(r"\b([A-Z]{2}\d[A-Z])\b", text)
-                    teachers = re.findall(r"\b[A-Z0-9]{2,3}\b", text)
-                    course_code = code_match.group(1) if code_match else ""
-                    rooms_found, tokens_wo_rooms = split_room_tokens(text)
-                    course_name = clean_course_name(" ".join(tokens_wo_rooms), course_code, teachers, rooms_found)
-                    room = rooms_found
-
-                    entry = {
-                        "week": week_num,
-                        "year_option": g_val["year_option"],
-                        "group": g_val["group"],
-                        "series": series_list if series_list else g_val["series"],
-                        "date": date,
-                        "day_name": day_name_fr,
-                        "start_time": minutes_to_hhmm(start_min),
-                        "end_time": minutes_to_hhmm(end_min),
-                        "course_code": course_code,
-                        "teachers": teachers,
-                        "room": room,
-                        "course_name": course_name,
-                    }
-                    entries.append(entry)
+                text = " ".join(page.block_text(rect).split())
+                code_match = re.search(r"\b([A-Z]{2}\d[A-Z])\b", text)
+                teachers = re.findall(r"\b[A-Z0-9]{2,3}\b", text)
+                course_code = code_match.group(1) if code_match else ""
+                rooms_found, tokens_wo_rooms = split_room_tokens(text)
+                course_name = clean_course_name(" ".join(tokens_wo_rooms), course_code, teachers, rooms_found)
+                room = rooms_found
+
+                entry = ScheduleEntry(
+                    week=week_num,
+                    year_option=sys.intern(g_val["year_option"]),
+                    group=g_val["group"],
+                    series=intern_tuple(series_list if series_list else g_val["series"]),
+                    date=sys.intern(date),
+                    day_name=sys.intern(day_name_fr),
+                    start_time=sys.intern(minutes_to_hhmm(start_min)),
+                    end_time=sys.intern(minutes_to_hhmm(end_min)),
+                    course_code=sys.intern(course_code),
+                    teachers=intern_tuple(teachers),
+                    room=intern_tuple(room),
+                    course_name=sys.intern(course_name),
+                )
+                entries.append(entry)
 
     return entries
 
 
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def shard_path(source: ScheduleSource, year_option: str) -> str:
+    """Chemin du shard, relatif à SHARDS_DIR (toujours avec des /, c'est aussi la clé du manifest)."""
+    return f"{source.key}_{year_option}.json"
+
+
+def parser_version() -> str:
+    """Empreinte du parseur: ce module et la version de pdfplumber.
+
+    Un shard n'est réutilisé que s'il a été produit par le même parseur; toute modification
+    de ce fichier (helpers compris) force donc un reparse complet.
+    """
+    digest = hashlib.sha256(Path(__file__).read_bytes())
+    digest.update(pdfplumber.__version__.encode("ascii"))
+    return digest.hexdigest()[:16]
+
+
+def write_if_changed(path: Path, text: str) -> bool:
+    # newline="" : comparer et écrire tel quel (les .ics sont en CRLF)
+    if path.exists():
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            if f.read() == text:
+                return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+    return True
+
+
+def load_manifest(shards_dir: Path) -> dict:
+    path = shards_dir / MANIFEST_NAME
+    if not path.exists():
+        return {"shards": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_build_state(state_path: Path) -> dict:
+    if not state_path.exists():
+        return {"parser": None, "sources": {}}
+    with open(state_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_shard(shards_dir: Path, rel_path: str) -> List[ScheduleEntry]:
+    with open(shards_dir / rel_path, "r", encoding="utf-8") as f:
+        return [ScheduleEntry.from_dict(d) for d in json.load(f)]
+
+
+def build_shards(
+    sources: List[ScheduleSource], shards_dir: Path, state_path: Path, force: bool = False
+) -> Tuple[Dict[str, List[ScheduleEntry]], List[ScheduleEntry]]:
+    """Écrit les shards et le manifest; ne reparse que les pdf modifiés depuis le dernier build.
+
+    L'état du build (state_path: version du parseur, sha256 et shards de chaque pdf) reste
+    à part du manifest publié. Tout est reparsé si force ou si le parseur a changé (voir
+    parser_version). Retourne ({chemin de shard: entrées}, toutes les entrées dans l'ordre
+    de parsing des pdf).
+    """
+    previous = load_build_state(state_path)
+    previous_shards = {rel for known in previous["sources"].values() for rel in known["shards"]}
+    version = parser_version()
+    if force or previous.get("parser") != version:
+        if previous["sources"]:
+            print("Parseur modifié ou --force: tous les pdf sont reparsés")
+        previous["sources"] = {}
+    state_sources = {}
+    manifest_shards = []
+    shards: Dict[str, List[ScheduleEntry]] = {}
+    all_entries: List[ScheduleEntry] = []
+
+    for source in sources:
+        digest = file_sha256(source.path)
+        known = previous["sources"].get(source.path.name)
+        reusable = (
+            known is not None
+            and known["sha256"] == digest
+            and all((shards_dir / rel).exists() for rel in known["shards"])
+        )
+
+        if reusable:
+            print(f"Inchangé {source.path.name}")
+            source_shards = {rel: load_shard(shards_dir, rel) for rel in known["shards"]}
+            # order: index du shard de chaque entrée, pour retrouver l'ordre de parsing
+            cursors = [iter(entries) for entries in source_shards.values()]
+            order = [int(i) for i in known["order"].split(",")] if known["order"] else []
+            source_entries = [next(cursors[i]) for i in order]
+        else:
+            print(f"Traitement {source.path.name} ({source.period}, semaine {source.week})")
+            source_entries = parse_week_file(source.path)
+            source_shards = {}
+            for entry in source_entries:
+                source_shards.setdefault(shard_path(source, entry.year_option), []).append(entry)
+
+        positions = {rel: i for i, rel in enumerate(source_shards)}
+        order = ",".join(str(positions[shard_path(source, e.year_option)]) for e in source_entries)
+        all_entries.extend(source_entries)
+
+        for rel, entries in source_shards.items():
+            text = json.dumps([e.to_dict() for e in entries], ensure_ascii=False, indent=2)
+            if write_if_changed(shards_dir / rel, text):
+                print(f"  shard écrit: {rel}")
+            # année, période et type sont déjà dans le chemin
+            manifest_shards.append(
+                {
+                    "path": rel,
+                    "year_option": entries[0].year_option,
+                    "week": source.week,
+                    "sha256": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+                }
+            )
+            shards[rel] = entries
+        state_sources[source.path.name] = {
+            "sha256": digest,
+            "shards": list(source_shards),
+            "order": order,
+        }
+
+    # shards dont le pdf a disparu ou qui n'ont plus d'entrées
+    for rel in previous_shards - shards.keys():
+        stale = shards_dir / rel
+        if stale.exists():
+            stale.unlink()
+            print(f"  shard supprimé: {rel}")
+            for parent in stale.parents:
+                if parent == shards_dir or any(parent.iterdir()):
+                    break
+                parent.rmdir()
+
+    write_if_changed(
+        shards_dir / MANIFEST_NAME,
+        json.dumps({"shards": manifest_shards}, ensure_ascii=False, separators=(",", ":")),
+    )
+    write_if_changed(
+        state_path,
+        json.dumps({"parser": version, "sources": state_sources}, ensure_ascii=False, indent=2),
+    )
+    return shards, all_entries
+
+
+# règles CET/CEST de l'UE, suffisantes pour tous les agendas courants
+ICS_VTIMEZONE = [
+    "BEGIN:VTIMEZONE",
+    f"TZID:{ICS_TZID}",
+    "BEGIN:DAYLIGHT",
+    "TZOFFSETFROM:+0100",
+    "TZOFFSETTO:+0200",
+    "TZNAME:CEST",
+    "DTSTART:19700329T020000",
+    "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU",
+    "END:DAYLIGHT",
+    "BEGIN:STANDARD",
+    "TZOFFSETFROM:+0200",
+    "TZOFFSETTO:+0100",
+    "TZNAME:CET",
+    "DTSTART:19701025T030000",
+    "RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU",
+    "END:STANDARD",
+    "END:VTIMEZONE",
+]
+
+
+def ics_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def ics_fold(line: str) -> str:
+    """Coupe les lignes à 75 octets comme l'exige la RFC 5545."""
+    raw = line.encode("utf-8")
+    if len(raw) <= 75:
+        return line
+    parts = []
+    limit = 75
+    while raw:
+        cut = min(limit, len(raw))
+        # ne pas couper au milieu d'un caractère utf-8
+        while cut < len(raw) and (raw[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(raw[:cut].decode("utf-8"))
+        raw = raw[cut:]
+        limit = 74  # la ligne de continuation commence par un espace
+    return "\r\n ".join(parts)
+
+
+def ics_uid(entry: ScheduleEntry) -> str:
+    """UID stable: ne dépend que du créneau et du cours, pas du local ni des profs.
+
+    Un changement de local garde donc le même événement dans l'agenda.
+    """
+    key = "|".join(
+        [
+            entry.date,
+            entry.start_time,
+            entry.year_option,
+            str(entry.group),
+            ",".join(entry.series),
+            entry.course_code or entry.course_name,
+        ]
+    )
+    return f"{hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]}@{ICS_UID_DOMAIN}"
+
+
+class IcsEventStore:
+    """Suivi par UID du contenu publié, pour SEQUENCE / DTSTAMP / LAST-MODIFIED.
+
+    Un événement inchangé garde ses valeurs (le .ics reste identique octet pour octet);
+    un événement modifié (local, profs, horaire...) passe à SEQUENCE+1 avec l'heure du build,
+    ce qui permet aux agendas de voir qu'il a changé.
+    """
+
+    def __init__(self, previous: Dict[str, dict], build_stamp: str) -> None:
+        self.previous = previous
+        self.build_stamp = build_stamp
+        self.events: Dict[str, dict] = {}
+
+    def resolve(self, uid: str, digest: str) -> dict:
+        # un même bloc figure dans l'agenda de chaque série: une seule résolution par build
+        if uid in self.events:
+            return self.events[uid]
+        old = self.previous.get(uid)
+        if old is not None and old["hash"] == digest:
+            state = old
+        else:
+            sequence = old["sequence"] + 1 if old is not None else 0
+            state = {"hash": digest, "sequence": sequence, "stamp": self.build_stamp}
+        self.events[uid] = state
+        return state
+
+
+def ics_event_lines(entry: ScheduleEntry, uid: str, store: IcsEventStore) -> List[str]:
+    day = entry.date.replace("-", "")
+    summary = f"{entry.course_code} {entry.course_name}".strip() if entry.course_code else entry.course_name
+    description = []
+    if entry.teachers:
+        description.append("Enseignants: " + ", ".join(entry.teachers))
+    if entry.series:
+        description.append("Séries: " + ", ".join(entry.series))
+    body = [
+        f"DTSTART;TZID={ICS_TZID}:{day}T{entry.start_time.replace(':', '')}00",
+        f"DTEND;TZID={ICS_TZID}:{day}T{entry.end_time.replace(':', '')}00",
+        f"SUMMARY:{ics_escape(summary)}",
+    ]
+    if entry.room:
+        body.append(f"LOCATION:{ics_escape(', '.join(entry.room))}")
+    if description:
+        body.append(f"DESCRIPTION:{ics_escape(chr(10).join(description))}")
+
+    state = store.resolve(uid, hashlib.sha1("\n".join(body).encode("utf-8")).hexdigest()[:16])
+    return [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{state['stamp']}",
+        f"LAST-MODIFIED:{state['stamp']}",
+        f"SEQUENCE:{state['sequence']}",
+        *body,
+        "END:VEVENT",
+    ]
+
+
+def render_ics(name: str, entries: List[ScheduleEntry], store: IcsEventStore) -> str:
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//ECAM//Companion App Student//FR",
+        "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{ics_escape(name)}",
+        f"X-WR-TIMEZONE:{ICS_TZID}",
+        *ICS_VTIMEZONE,
+    ]
+    seen: Dict[str, int] = {}
+    for entry in sorted(entries, key=lambda e: (e.date, e.start_time, e.end_time, e.course_code, e.course_name)):
+        uid = ics_uid(entry)
+        # deux blocs identiques sur la même plage: suffixe déterministe
+        count = seen.get(uid, 0)
+        seen[uid] = count + 1
+        if count:
+            uid = uid.replace("@", f"-{count}@", 1)
+        lines.extend(ics_event_lines(entry, uid, store))
+    lines.append("END:VCALENDAR")
+    return "".join(ics_fold(line) + "\r\n" for line in lines)
+
+
+def ics_calendar_key(entry: ScheduleEntry, series: Optional[str]) -> str:
+    """Chemin relatif à ICS_DIR: <année académique>/<year_option>_g<groupe>[_<série>].ics"""
+    year = academic_year_for(datetime.strptime(entry.date, "%Y-%m-%d"))
+    name = f"{entry.year_option}_g{entry.group}"
+    if series:
+        name += "_" + re.sub(r"[^0-9A-Za-z]+", "-", series)
+    return f"{year}/{name}.ics"
+
+
+def build_ics_files(entries: List[ScheduleEntry], ics_dir: Path, state_path: Path) -> int:
+    """Écrit un .ics par année/year_option/groupe/série; retourne le nombre de fichiers modifiés."""
+    calendars: Dict[str, List[ScheduleEntry]] = {}
+    for entry in entries:
+        # un bloc suivi par plusieurs séries apparaît dans l'agenda de chacune
+        for series in entry.series or (None,):
+            calendars.setdefault(ics_calendar_key(entry, series), []).append(entry)
+
+    previous = {}
+    if state_path.exists():
+        with open(state_path, "r", encoding="utf-8") as f:
+            previous = json.load(f)["events"]
+    store = IcsEventStore(previous, datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"))
+
+    changed = 0
+    for rel, cal_entries in calendars.items():
+        name = f"ECAM {Path(rel).stem.replace('_', ' ')}"
+        if write_if_changed(ics_dir / rel, render_ics(name, cal_entries, store)):
+            changed += 1
+    # les UID disparus sont oubliés: s'ils reviennent, ils repartent à SEQUENCE:0
+    write_if_changed(
+        state_path,
+        json.dumps({"events": dict(sorted(store.events.items()))}, ensure_ascii=False, indent=2),
+    )
+
+    if ics_dir.exists():
+        for stale in ics_dir.glob("*/*.ics"):
+            if stale.relative_to(ics_dir).as_posix() not in calendars:
+                stale.unlink()
+                print(f"  ics supprimé: {stale.relative_to(ics_dir).as_posix()}")
+    print(f"{len(calendars)} calendriers .ics dans {ics_dir} ({changed} modifiés)")
+    return changed
+
+
 def main():
-    all_entries = []
-    for pdf in sorted(PDF_DIR.glob("P1_horsem_*_Semaine_du__Lu_*_2025*.pdf")):
-        week_num = int(re.search(r"_0?(\d+)_Semaine_du__", pdf.name).group(1))
-        print(f"Traitement {pdf.name} (semaine {week_num})")
-        all_entries.extend(parse_week_file(pdf))
+    parser = argparse.ArgumentParser(description="Horaires ECAM: pdf -> shards JSON, JSON monolithique et .ics")
+    parser.add_argument("--force", action="store_true", help="reparser tous les pdf, même inchangés")
+    args = parser.parse_args()
+
+    sources = discover_pdfs(PDF_DIR)
+    shards, all_entries = build_shards(sources, SHARDS_DIR, SHARDS_STATE_PATH, force=args.force)
+    print(f"{len(shards)} shards et {MANIFEST_NAME} dans {SHARDS_DIR}")
 
+    # fichier monolithique conservé tant que l'app ne lit pas encore les shards,
+    # dans l'ordre de parsing (pdf par pdf) pour rester identique à l'ancien fichier
     with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-        json.dump(all_entries, f, ensure_ascii=False, indent=2)
+        json.dump([e.to_dict() for e in all_entries], f, ensure_ascii=False, indent=2)
 
     print(f"JSON écrit dans {OUTPUT_JSON}")
 
+    build_ics_files(all_entries, ICS_DIR, ICS_STATE_PATH)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,256 @@
+"""Corpus de référence des parseurs: fige leurs sorties et signale toute différence.
+
+À lancer depuis la racine du dépôt, avant et après chaque optimisation d'un parseur:
+
+    python scripts/golden_corpus.py snapshot   # (ré)écrit scripts/golden/
+    python scripts/golden_corpus.py check      # reparse tout et compare à scripts/golden/
+    python scripts/golden_corpus.py check --cache  # idem, extraction pdfplumber en cache
+
+--cache garde ce que pdfplumber extrait de chaque pdf (tables, rects, mots, texte des
+blocs) dans scripts/.extract_cache/, indexé par sha256 du pdf: après un premier passage,
+seule la logique du parseur est rejouée, en quelques secondes au lieu de minutes. Le cache
+court-circuite l'extraction: seul un check sans --cache valide un changement de
+PageContent, de extract_pages ou de pdfplumber.
+
+Entrées: les pdf de "Horaire cours/", annuaire.html, et les pages sauvegardées dans
+scripts/corpus/fiches/<code>.html et scripts/corpus/profiles/<slug>.html (captures du
+site, telles que téléchargées) si présentes.
+
+scripts/corpus/synthetic/ (goldens dans scripts/golden/synthetic/) contient des pages
+SYNTHÉTIQUES, écrites à partir des JSON déjà scrapés dans la forme que lisent les parseurs:
+elles figent le comportement du parseur sur cette forme, mais ne garantissent rien sur la
+structure réelle du site. Seules des captures dans corpus/fiches et corpus/profiles le font.
+"""
+
+import argparse
+import difflib
+import functools
+import json
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+GOLDEN_DIR = Path("scripts/golden")
+CORPUS_DIR = Path("scripts/corpus")
+EXTRACT_CACHE_DIR = Path("scripts/.extract_cache")
+ANNUAIRE_HTML = Path("annuaire.html")
+FICHE_URL = "https://plus.ecam.be/public/fiche/2025/{code}"
+
+# l'annuaire est aussi relu par petits morceaux: une frontière de feed() tombe alors
+# dans le texte de presque chaque lien, et le résultat ne doit pas en dépendre
+ANNUAIRE_CHUNK_SIZES = (31, 7)
+
+# au-delà, on résume: une régression touche souvent des centaines d'entrées d'un coup
+MAX_DIFFS_PER_FILE = 20
+
+
+def list_jobs():
+    """[(nom du golden, type de parseur, chemin d'entrée)] pour tout le corpus."""
+    from fetch_horaire_classes import PDF_DIR, discover_pdfs
+
+    jobs = []
+    for source in discover_pdfs(PDF_DIR):
+        name = f"schedule/{source.key.replace('/', '_')}.json"
+        jobs.append((name, "schedule", source.path))
+    if ANNUAIRE_HTML.exists():
+        jobs.append(("annuaire.json", "annuaire", ANNUAIRE_HTML))
+    for prefix in ("", "synthetic/"):
+        for path in sorted((CORPUS_DIR / prefix / "profiles").glob("*.html")):
+            jobs.append((f"{prefix}profiles/{path.stem}.json", "profile", path))
+        for path in sorted((CORPUS_DIR / prefix / "fiches").glob("*.html")):
+            jobs.append((f"{prefix}fiches/{path.stem}.json", "fiche", path))
+    return jobs
+
+
+def cached_pages(path):
+    """Pages extraites du pdf, relues depuis EXTRACT_CACHE_DIR si le pdf n'a pas changé."""
+    import pdfplumber
+    from fetch_horaire_classes import PageContent, extract_pages, file_sha256
+
+    key = f"{file_sha256(path)}_{pdfplumber.__version__}_v{PageContent.VERSION}"
+    cache_path = EXTRACT_CACHE_DIR / f"{key}.pickle"
+    if cache_path.exists():
+        with open(cache_path, "rb") as f:
+            return pickle.load(f)
+    pages = [page.detach() for page in extract_pages(path)]
+    EXTRACT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(pages, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+    return pages
+
+
+def run_job(job, cache=False):
+    """Exécute un parseur sur une entrée; tourne dans un process du pool."""
+    name, kind, path = job
+    if kind == "schedule":
+        from fetch_horaire_classes import parse_pages, parse_week_file
+
+        entries = parse_pages(path.name, cached_pages(path)) if cache else parse_week_file(path)
+        output = [entry.to_dict() for entry in entries]
+    elif kind == "annuaire":
+        from fetch_ecam_professors import collect_slugs_and_fallback_names
+
+        html = path.read_text(encoding="utf-8")
+
+        def parse_annuaire(*chunk_size):
+            return [
+                {"slug": slug, "fallback_name": fallback}
+                for slug, fallback in collect_slugs_and_fallback_names(html, *chunk_size)
+            ]
+
+        output = parse_annuaire()
+        for chunk_size in ANNUAIRE_CHUNK_SIZES:
+            chunked = parse_annuaire(chunk_size)
+            if chunked != output:
+                # c'est le découpage qui diffère du golden qu'on rapporte
+                output = chunked
+                break
+    elif kind == "profile":
+        from bs4 import BeautifulSoup
+        from fetch_ecam_professors import build_professor_entry
+
+        soup = BeautifulSoup(path.read_text(encoding="utf-8"), "html.parser")
+        output = build_professor_entry(0, path.stem, "", soup)
+    elif kind == "fiche":
+        from fetch_fiches_pea import parse_course_page
+
+        output = parse_course_page(path.read_text(encoding="utf-8"), FICHE_URL.format(code=path.stem))
+    else:
+        raise ValueError(f"Parseur inconnu: {kind}")
+    # passer par JSON: on compare exactement ce qui serait écrit sur disque
+    return name, json.loads(json.dumps(output, ensure_ascii=False))
+
+
+def run_all(jobs, workers, cache=False):
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return dict(pool.map(functools.partial(run_job, cache=cache), jobs))
+
+
+def diff_values(expected, actual, path=""):
+    """Différences structurelles [(chemin, attendu, obtenu)] entre deux valeurs JSON."""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        diffs = []
+        for key in list(expected) + [k for k in actual if k not in expected]:
+            sub = f"{path}.{key}" if path else str(key)
+            if key not in actual:
+                diffs.append((sub, expected[key], "<absent>"))
+            elif key not in expected:
+                diffs.append((sub, "<absent>", actual[key]))
+            else:
+                diffs.extend(diff_values(expected[key], actual[key], sub))
+        return diffs
+    if isinstance(expected, list) and isinstance(actual, list) and len(expected) == len(actual):
+        diffs = []
+        for idx, (exp, act) in enumerate(zip(expected, actual)):
+            diffs.extend(diff_values(exp, act, f"{path}[{idx}]"))
+        return diffs
+    if expected != actual:
+        return [(path or "<racine>", expected, actual)]
+    return []
+
+
+def diff_records(expected, actual):
+    """Comme diff_values, mais aligne d'abord les listes d'enregistrements.
+
+    Une entrée ajoutée ou retirée n'est ainsi signalée qu'une fois, au lieu de décaler
+    toutes les suivantes.
+    """
+    if not (isinstance(expected, list) and isinstance(actual, list)):
+        return diff_values(expected, actual)
+    keys_exp = [json.dumps(r, sort_keys=True, ensure_ascii=False) for r in expected]
+    keys_act = [json.dumps(r, sort_keys=True, ensure_ascii=False) for r in actual]
+    matcher = difflib.SequenceMatcher(a=keys_exp, b=keys_act, autojunk=False)
+    diffs = []
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == "equal":
+            continue
+        if op == "replace" and i2 - i1 == j2 - j1:
+            for i, j in zip(range(i1, i2), range(j1, j2)):
+                diffs.extend(diff_values(expected[i], actual[j], f"[{i}]"))
+            continue
+        for i in range(i1, i2):
+            diffs.append((f"[{i}]", expected[i], "<supprimé>"))
+        for j in range(j1, j2):
+            diffs.append((f"[+{j}]", "<ajouté>", actual[j]))
+    return diffs
+
+
+def short(value, limit=120):
+    text = value if isinstance(value, str) and value.startswith("<") else json.dumps(value, ensure_ascii=False)
+    return text if len(text) <= limit else text[: limit - 3] + "..."
+
+
+def snapshot(jobs, workers, prune=True, cache=False):
+    outputs = run_all(jobs, workers, cache)
+    for name, output in outputs.items():
+        path = GOLDEN_DIR / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(output, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    # goldens dont l'entrée a disparu (pas avec -k: le reste du corpus n'a pas été relancé)
+    if prune:
+        for path in GOLDEN_DIR.rglob("*.json"):
+            if path.relative_to(GOLDEN_DIR).as_posix() not in outputs:
+                path.unlink()
+    print(f"{len(outputs)} goldens écrits dans {GOLDEN_DIR}")
+    return 0
+
+
+def check(jobs, workers, prune=True, cache=False):
+    outputs = run_all(jobs, workers, cache)
+    goldens = {p.relative_to(GOLDEN_DIR).as_posix() for p in GOLDEN_DIR.rglob("*.json")}
+    if not prune:
+        goldens &= outputs.keys()
+    failed = 0
+
+    for name in sorted(goldens | outputs.keys()):
+        if name not in outputs:
+            print(f"✗ {name}: golden sans entrée correspondante")
+            failed += 1
+            continue
+        if name not in goldens:
+            print(f"✗ {name}: pas de golden (lancer snapshot)")
+            failed += 1
+            continue
+        expected = json.loads((GOLDEN_DIR / name).read_text(encoding="utf-8"))
+        diffs = diff_records(expected, outputs[name])
+        if not diffs:
+            continue
+        failed += 1
+        print(f"✗ {name}: {len(diffs)} différence(s)")
+        for path, exp, act in diffs[:MAX_DIFFS_PER_FILE]:
+            print(f"    {path}: {short(exp)} -> {short(act)}")
+        if len(diffs) > MAX_DIFFS_PER_FILE:
+            print(f"    ... {len(diffs) - MAX_DIFFS_PER_FILE} autres")
+
+    print(f"{failed} golden(s) en échec sur {len(goldens | outputs.keys())}")
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Corpus de référence des parseurs")
+    parser.add_argument("command", choices=["snapshot", "check"])
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="process en parallèle")
+    parser.add_argument("-k", "--filter", default="", help="ne garder que les goldens dont le nom contient ce texte")
+    parser.add_argument("--cache", action="store_true", help=f"extraction pdfplumber en cache dans {EXTRACT_CACHE_DIR}")
+    args = parser.parse_args()
+
+    jobs = [job for job in list_jobs() if args.filter in job[0]]
+    if not jobs:
+        raise SystemExit("Aucune entrée dans le corpus")
+    # les pdf les plus lourds d'abord pour mieux remplir le pool
+    jobs.sort(key=lambda job: job[2].stat().st_size, reverse=True)
+
+    start = time.perf_counter()
+    command = {"snapshot": snapshot, "check": check}[args.command]
+    status = command(jobs, args.jobs, prune=not args.filter, cache=args.cache)
+    print(f"{len(jobs)} entrées en {time.perf_counter() - start:.1f}s ({args.jobs} process)")
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
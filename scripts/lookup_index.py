@@ -0,0 +1,307 @@
+"""Index de recherche compact des JSON des scrapers (scripts/.build/index/<fichier>.idx).
+
+L'index sert aux outils Python (LookupIndex); l'app ne le lit pas, il reste donc hors de
+composeResources.
+
+Format (little-endian), pensé pour être lu via mmap sans tout charger:
+
+    en-tête    b"ECIX" + version u32 + nb_records u32 + nb_sections u32
+               + longueur du JSON u32 + mtime du JSON u64 (ns) + sha256 du JSON (32 o)
+    spans      nb_records x (offset u32, longueur u32): octets de chaque record dans le JSON
+    sections   nb_sections x (nom 16 o, nb_clés u32, off_entrées u32, off_clés u32, off_valeurs u32)
+    par section:
+      entrées  nb_clés x (off_clé u32, len_clé u32, off_valeurs u32, nb_valeurs u32), triées par clé
+      clés     octets utf-8 des clés
+      valeurs  u32: numéros de records
+
+Une recherche = une recherche dichotomique dans les entrées, puis json.loads des seuls
+records trouvés. Le JSON et l'index sont écrits dans des fichiers temporaires puis
+renommés. À l'ouverture, longueur et mtime du JSON suffisent; le sha256 n'est recalculé
+que si le mtime a changé (copie, checkout), et un index qui ne correspond pas est refusé.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import unicodedata
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+MAGIC = b"ECIX"
+VERSION = 3
+HEADER = struct.Struct("<4sIIIIQ32s")
+SPAN = struct.Struct("<II")
+SECTION = struct.Struct("<16sIIII")
+ENTRY = struct.Struct("<IIII")
+VALUE = struct.Struct("<I")
+
+INDEX_DIR = Path("scripts/.build/index")
+
+
+def strip_accents(value: str) -> str:
+    return "".join(
+        char for char in unicodedata.normalize("NFKD", value) if not unicodedata.combining(char)
+    )
+
+
+def normalize(value: str) -> str:
+    return strip_accents(value).lower()
+
+
+def name_tokens(*values: Optional[str]) -> List[str]:
+    tokens = []
+    for value in values:
+        tokens.extend(re.findall(r"[a-z0-9]+", normalize(value or "")))
+    return tokens
+
+
+def trigrams(tokens: Iterable[str]) -> List[str]:
+    return [tok[i : i + 3] for tok in tokens for i in range(len(tok) - 2)]
+
+
+def index_path_for(data_path: Path) -> Path:
+    return INDEX_DIR / f"{data_path.stem}.idx"
+
+
+def dump_records(records: List[dict], wrapper_key: Optional[str] = None):
+    """Sérialise comme json.dumps(..., indent=2) en notant la place de chaque record.
+
+    Retourne (octets du fichier, [(offset, longueur)] par record).
+    """
+    indent = "    " if wrapper_key else "  "
+    prefix = f'{{\n  {json.dumps(wrapper_key)}: [' if wrapper_key else "["
+    suffix = "\n  ]\n}" if wrapper_key else "\n]"
+    if not records:
+        prefix, suffix = (f'{{\n  {json.dumps(wrapper_key)}: []\n}}', "") if wrapper_key else ("[]", "")
+
+    chunks = [prefix.encode("utf-8")]
+    pos = len(chunks[0])
+    spans = []
+    for idx, record in enumerate(records):
+        sep = ("," if idx else "") + "\n" + indent
+        text = json.dumps(record, ensure_ascii=False, indent=2).replace("\n", "\n" + indent)
+        sep_bytes = sep.encode("utf-8")
+        body = text.encode("utf-8")
+        spans.append((pos + len(sep_bytes), len(body)))
+        chunks.extend((sep_bytes, body))
+        pos += len(sep_bytes) + len(body)
+    chunks.append(suffix.encode("utf-8"))
+    return b"".join(chunks), spans
+
+
+def build_index(
+    data: bytes, data_mtime_ns: int, spans, sections: Dict[str, Dict[str, List[int]]]
+) -> bytes:
+    directory = []
+    blobs = []
+    offset = HEADER.size + SPAN.size * len(spans) + SECTION.size * len(sections)
+    for name, mapping in sections.items():
+        if len(name.encode("ascii")) > 16:
+            raise ValueError(f"Nom de section trop long (16 octets max): {name}")
+        keys = sorted((key.encode("utf-8"), sorted(set(values))) for key, values in mapping.items())
+        entries, key_heap, value_heap = [], bytearray(), []
+        for key, values in keys:
+            entries.append(ENTRY.pack(len(key_heap), len(key), len(value_heap), len(values)))
+            key_heap += key
+            value_heap.extend(values)
+        entries_blob = b"".join(entries)
+        values_blob = b"".join(VALUE.pack(v) for v in value_heap)
+        entries_off = offset
+        keys_off = entries_off + len(entries_blob)
+        values_off = keys_off + len(key_heap)
+        directory.append(SECTION.pack(name.encode("ascii"), len(keys), entries_off, keys_off, values_off))
+        blobs.extend((entries_blob, bytes(key_heap), values_blob))
+        offset = values_off + len(values_blob)
+
+    return b"".join(
+        [
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                len(spans),
+                len(sections),
+                len(data),
+                data_mtime_ns,
+                hashlib.sha256(data).digest(),
+            ),
+            *(SPAN.pack(*span) for span in spans),
+            *directory,
+            *blobs,
+        ]
+    )
+
+
+def write_indexed_json(
+    records: List[dict],
+    data_path: Path,
+    keys: Dict[str, Callable[[dict], Iterable[str]]],
+    wrapper_key: Optional[str] = None,
+) -> Path:
+    """Écrit le JSON (même rendu que json.dump indent=2) et son index.
+
+    keys: nom de section -> fonction qui donne les clés d'un record. Les clés sont
+    normalisées (minuscules, sans accents), à la lecture comme à l'écriture. La section
+    "name" (jetons de name_tokens) et la section "trigram" dérivée servent à LookupIndex.search.
+    """
+    data, spans = dump_records(records, wrapper_key)
+    sections: Dict[str, Dict[str, List[int]]] = {}
+    for name, key_fn in keys.items():
+        mapping = sections.setdefault(name, {})
+        for idx, record in enumerate(records):
+            for key in key_fn(record):
+                if key:
+                    mapping.setdefault(normalize(key), []).append(idx)
+    if "name" in sections:
+        sections["trigram"] = {}
+        for token, ids in sections["name"].items():
+            for gram in trigrams([token]):
+                sections["trigram"].setdefault(gram, []).extend(ids)
+
+    index_path = index_path_for(data_path)
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_data = data_path.with_name(data_path.name + ".tmp")
+    tmp_index = index_path.with_name(index_path.name + ".tmp")
+    tmp_data.write_bytes(data)
+    # os.replace garde le mtime: c'est celui que verra LookupIndex
+    tmp_index.write_bytes(build_index(data, tmp_data.stat().st_mtime_ns, spans, sections))
+    # index renommé en dernier: entre les deux, l'ancien index ne valide pas le nouveau JSON
+    os.replace(tmp_data, data_path)
+    os.replace(tmp_index, index_path)
+    return index_path
+
+
+class LookupIndex:
+    """Lecture de l'index et du JSON via mmap; seuls les records trouvés sont décodés."""
+
+    def __init__(self, data_path: Path, index_path: Optional[Path] = None) -> None:
+        index_path = index_path or index_path_for(data_path)
+        self._data_file = open(data_path, "rb")
+        self._index_file = open(index_path, "rb")
+        self._data = mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._index = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            (
+                magic,
+                version,
+                self.record_count,
+                section_count,
+                data_len,
+                data_mtime_ns,
+                data_sha,
+            ) = HEADER.unpack_from(self._index, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"Index invalide ou d'une autre version: {index_path}")
+            stat = os.fstat(self._data_file.fileno())
+            matches = stat.st_size == data_len and (
+                # même mtime: fichier intact depuis l'écriture, pas besoin de le relire
+                stat.st_mtime_ns == data_mtime_ns
+                or hashlib.sha256(self._data).digest() == data_sha
+            )
+            if not matches:
+                raise ValueError(f"Index {index_path} ne correspond pas à {data_path}: le régénérer")
+        except (ValueError, struct.error):
+            self.close()
+            raise
+        self._spans_off = HEADER.size
+        self._sections = {}
+        base = self._spans_off + SPAN.size * self.record_count
+        for i in range(section_count):
+            raw_name, *layout = SECTION.unpack_from(self._index, base + i * SECTION.size)
+            self._sections[raw_name.rstrip(b"\0").decode("ascii")] = layout
+
+    def close(self) -> None:
+        self._data.close()
+        self._index.close()
+        self._data_file.close()
+        self._index_file.close()
+
+    def __enter__(self) -> "LookupIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.record_count
+
+    def record(self, idx: int) -> dict:
+        offset, length = SPAN.unpack_from(self._index, self._spans_off + idx * SPAN.size)
+        return json.loads(self._data[offset : offset + length].decode("utf-8"))
+
+    def _entry(self, section, pos):
+        count, entries_off, keys_off, values_off = self._sections[section]
+        key_off, key_len, val_off, val_count = ENTRY.unpack_from(self._index, entries_off + pos * ENTRY.size)
+        key = self._index[keys_off + key_off : keys_off + key_off + key_len]
+        return key, values_off + val_off * VALUE.size, val_count
+
+    def _lower_bound(self, section, key: bytes) -> int:
+        lo, hi = 0, self._sections[section][0]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(section, mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _values(self, values_at, count) -> List[int]:
+        return list(struct.unpack_from(f"<{count}I", self._index, values_at))
+
+    def ids(self, section: str, key: str) -> List[int]:
+        if section not in self._sections:
+            return []
+        raw = normalize(key).encode("utf-8")
+        pos = self._lower_bound(section, raw)
+        if pos < self._sections[section][0]:
+            found, values_at, count = self._entry(section, pos)
+            if found == raw:
+                return self._values(values_at, count)
+        return []
+
+    def prefix_ids(self, section: str, prefix: str) -> List[int]:
+        if section not in self._sections:
+            return []
+        raw = normalize(prefix).encode("utf-8")
+        ids = set()
+        pos = self._lower_bound(section, raw)
+        while pos < self._sections[section][0]:
+            key, values_at, count = self._entry(section, pos)
+            if not key.startswith(raw):
+                break
+            ids.update(self._values(values_at, count))
+            pos += 1
+        return sorted(ids)
+
+    def get(self, section: str, key: str) -> List[dict]:
+        return [self.record(i) for i in self.ids(section, key)]
+
+    def search(self, query: str, limit: int = 20) -> List[dict]:
+        """Recherche au fil de la frappe: chaque mot tapé doit préfixer un mot du nom.
+
+        Sans résultat, on retombe sur les trigrammes (fautes, milieu de mot).
+        """
+        tokens = name_tokens(query)
+        if not tokens:
+            return []
+        matches = None
+        for token in tokens:
+            found = set(self.prefix_ids("name", token))
+            matches = found if matches is None else matches & found
+        if not matches:
+            grams = trigrams(tokens)
+            if not grams:
+                return []
+            scores: Dict[int, int] = {}
+            for gram in grams:
+                for idx in self.ids("trigram", gram):
+                    scores[idx] = scores.get(idx, 0) + 1
+            # au moins la moitié des trigrammes de la requête
+            threshold = (len(grams) + 1) // 2
+            ranked = sorted((idx for idx, n in scores.items() if n >= threshold), key=lambda i: (-scores[i], i))
+            return [self.record(i) for i in ranked[:limit]]
+        return [self.record(i) for i in sorted(matches)[:limit]]